@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import argparse
+import collections
 import csv
 import datetime as dt
-import filecmp
+import functools
+import hashlib
 import json
 import math
 import os
@@ -14,62 +16,202 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from statistics import fmean
+from typing import Any, Callable
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_REAL_CONTENT_MANIFEST = REPO_ROOT / "scripts/quality_manifests/vmaf_resource_real_content.json"
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+COMPARE_CHUNK_BYTES = 128 * 1024
 TOOL_USAGE_RE = re.compile(
-    r"tool_usage uv_non_dc_blocks=(?P<uv>\d+)\s+"
-    r"inter_newmv_blocks=(?P<newmv>\d+)\s+"
-    r"restoration_non_none_units=(?P<lr>\d+)\s+"
+    r"tool_usage uv_non_dc_blocks=(?P<uv>\d+)[ \t]+"
+    r"inter_newmv_blocks=(?P<newmv>\d+)[ \t]+"
+    r"restoration_non_none_units=(?P<lr>\d+)[ \t]+"
     r"seg1_blocks=(?P<seg1>\d+)"
 )
+TOOL_USAGE_COUNTERS = ("uv_non_dc_blocks", "inter_newmv_blocks", "restoration_non_none_units", "seg1_blocks")
+COMPARE_METRICS = ("bitrate_kbps", "psnr_avg", "ssim_all", "vmaf")
+COMPARE_ROW_FIELDS = frozenset(("clip_name", "q", "status", "ivf_path", *COMPARE_METRICS))
+STREAM_RESULTS_MIN_BYTES = 10 * 1024 * 1024
+DECODE_CACHE_NAME = "_decode_cache.json"
+PSNR_RE = re.compile(
+    r"PSNR y:(?P<y>[-+A-Za-z0-9.]+)\s+"
+    r"u:(?P<u>[-+A-Za-z0-9.]+)\s+"
+    r"v:(?P<v>[-+A-Za-z0-9.]+)\s+"
+    r"average:(?P<avg>[-+A-Za-z0-9.]+)"
+)
+SSIM_RE = re.compile(
+    r"SSIM Y:(?P<y>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+"
+    r"U:(?P<u>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+"
+    r"V:(?P<v>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+"
+    r"All:(?P<all>[-+A-Za-z0-9.]+)"
+)
+
+
+_LOG_LOCK = threading.Lock()
 
 
 def log(msg: str) -> None:
-    print(msg, file=sys.stderr)
+    with _LOG_LOCK:
+        print(msg, file=sys.stderr)
 
 
-def run_cmd(cmd: list[str], check: bool = True, cwd: Path | None = None) -> subprocess.CompletedProcess[str]:
+def run_cmd(
+    cmd: list[str],
+    check: bool = True,
+    cwd: Path | None = None,
+    text: bool = True,
+) -> subprocess.CompletedProcess[Any]:
     proc = subprocess.run(
         cmd,
         cwd=str(cwd) if cwd else None,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
+        text=text,
     )
     if check and proc.returncode != 0:
-        cmd_str = " ".join(cmd)
-        raise RuntimeError(
-            f"Command failed ({proc.returncode}): {cmd_str}\n"
-            f"stdout:\n{proc.stdout}\n"
-            f"stderr:\n{proc.stderr}\n"
-        )
+        stdout, stderr = proc.stdout, proc.stderr
+        if not text:
+            stdout = stdout.decode("utf-8", "replace")
+            stderr = stderr.decode("utf-8", "replace")
+        raise RuntimeError(format_cmd_failure(cmd, proc.returncode, stdout, stderr))
     return proc
 
 
+def run_cmd_streaming(cmd: list[str], line_filter: Callable[[str], None]) -> subprocess.CompletedProcess[str]:
+    stderr_lines: list[str] = []
+    with tempfile.TemporaryFile() as stdout_file:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=stdout_file,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        assert proc.stderr is not None
+        with proc.stderr:
+            for line in proc.stderr:
+                line_filter(line)
+                stderr_lines.append(line)
+        proc.wait()
+        stdout_file.seek(0)
+        stdout = stdout_file.read().decode("utf-8", "replace")
+
+    stderr = "".join(stderr_lines)
+    if proc.returncode != 0:
+        raise RuntimeError(format_cmd_failure(cmd, proc.returncode, stdout, stderr))
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def finite_or_none(obj: Any) -> Any:
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: finite_or_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite_or_none(v) for v in obj]
+    return obj
+
+
+def dump_json(path: Path, obj: Any) -> None:
+    obj = finite_or_none(obj)
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_bytes(json.dumps(obj, indent=2, ensure_ascii=False, allow_nan=False).encode("utf-8"))
+
+
+def format_cmd_failure(cmd: list[str], returncode: int, stdout: str, stderr: str) -> str:
+    cmd_str = " ".join(cmd)
+    return (
+        f"Command failed ({returncode}): {cmd_str}\n"
+        f"stdout:\n{stdout}\n"
+        f"stderr:\n{stderr}\n"
+    )
+
+
+def run_pipeline(producer: list[str], consumer: list[str]) -> subprocess.CompletedProcess[str]:
+    with tempfile.TemporaryFile() as producer_err:
+        prod = subprocess.Popen(producer, stdout=subprocess.PIPE, stderr=producer_err, close_fds=True)
+        try:
+            cons = subprocess.Popen(
+                consumer,
+                stdin=prod.stdout,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                close_fds=True,
+            )
+        except BaseException:
+            prod.kill()
+            prod.wait()
+            raise
+        finally:
+            assert prod.stdout is not None
+            prod.stdout.close()
+        cons_out, cons_err = cons.communicate()
+        prod.wait()
+        producer_err.seek(0)
+        prod_err = producer_err.read().decode("utf-8", "replace")
+
+    if cons.returncode != 0:
+        raise RuntimeError(format_cmd_failure(consumer, cons.returncode, cons_out, cons_err))
+    if prod.returncode != 0:
+        raise RuntimeError(format_cmd_failure(producer, prod.returncode, "", prod_err))
+    return subprocess.CompletedProcess(consumer, cons.returncode, cons_out, cons_err)
+
+
 def parse_tool_usage_from_stderr(stderr: str) -> dict[str, int] | None:
-    for line in stderr.splitlines():
-        m = TOOL_USAGE_RE.search(line.strip())
-        if not m:
-            continue
-        return {
-            "tool_uv_non_dc_blocks": int(m.group("uv")),
-            "tool_inter_newmv_blocks": int(m.group("newmv")),
-            "tool_restoration_non_none_units": int(m.group("lr")),
-            "tool_seg1_blocks": int(m.group("seg1")),
-        }
-    return None
+    m = TOOL_USAGE_RE.search(stderr)
+    if not m:
+        return None
+    return {
+        "tool_uv_non_dc_blocks": int(m.group("uv")),
+        "tool_inter_newmv_blocks": int(m.group("newmv")),
+        "tool_restoration_non_none_units": int(m.group("lr")),
+        "tool_seg1_blocks": int(m.group("seg1")),
+    }
 
 
-def safe_float(token: str | None) -> float | None:
-    if token is None:
+def safe_float(token: Any) -> float | None:
+    if isinstance(token, float):
+        return None if math.isnan(token) else token
+    if token is None or isinstance(token, bool):
         return None
+    if isinstance(token, int):
+        try:
+            return float(token)
+        except OverflowError:
+            return math.inf if token > 0 else -math.inf
+    if not isinstance(token, str):
+        token = str(token)
     t = token.strip().lower()
     if t in {"nan", ""}:
         return None
@@ -139,13 +281,78 @@ def find_encoder_bin(requested: str | None, build: bool) -> Path:
         )
 
     log("Building wav1c-cli...")
-    run_cmd(["cargo", "build", "-p", "wav1c-cli"], cwd=REPO_ROOT)
+    run_cmd(["cargo", "build", "-p", "wav1c-cli"], cwd=REPO_ROOT, text=False)
     for c in candidates:
         if c.exists():
             return c
     raise FileNotFoundError("Build finished but wav1c-cli binary was not found.")
 
 
+Y4M_CHROMA_LAYOUTS = {
+    "420": (1, 1, 2),
+    "422": (1, 0, 2),
+    "444": (0, 0, 2),
+    "mono": (0, 0, 0),
+}
+
+
+def y4m_duration_seconds(video_path: Path) -> float | None:
+    with video_path.open("rb") as f:
+        header = f.readline(4096)
+    if not header.startswith(b"YUV4MPEG2 ") or not header.endswith(b"\n"):
+        return None
+
+    width = height = 0
+    fps_num = fps_den = 0
+    colorspace = "420"
+    try:
+        for tok in header[10:].decode("ascii", "replace").split():
+            tag, val = tok[0], tok[1:]
+            if tag == "W":
+                width = int(val)
+            elif tag == "H":
+                height = int(val)
+            elif tag == "F":
+                num, _, den = val.partition(":")
+                fps_num, fps_den = int(num), int(den or 1)
+            elif tag == "C":
+                colorspace = val
+    except ValueError:
+        return None
+    if width <= 0 or height <= 0 or fps_num <= 0 or fps_den <= 0:
+        return None
+
+    layout = next((v for k, v in Y4M_CHROMA_LAYOUTS.items() if colorspace.startswith(k)), None)
+    if layout is None:
+        return None
+    ss_x, ss_y, chroma_planes = layout
+    chroma_samples = ((width + ss_x) >> ss_x) * ((height + ss_y) >> ss_y)
+    depth = re.search(r"p(\d+)$", colorspace)
+    bytes_per_sample = 2 if depth and int(depth.group(1)) > 8 else 1
+    frame_bytes = len(b"FRAME\n") + (width * height + chroma_planes * chroma_samples) * bytes_per_sample
+
+    payload = video_path.stat().st_size - len(header)
+    frames, rem = divmod(payload, frame_bytes)
+    if rem or frames <= 0:
+        return None
+    return frames * fps_den / fps_num
+
+
+@functools.lru_cache(maxsize=None)
+def _clip_duration_cached(ffprobe_bin: str, video_path: Path, mtime_ns: int, size: int) -> float:
+    if video_path.suffix.lower() == ".y4m":
+        duration = y4m_duration_seconds(video_path)
+        if duration is not None:
+            return duration
+    return ffprobe_duration_seconds(ffprobe_bin, video_path)
+
+
+def clip_duration_seconds(ffprobe_bin: str, video_path: Path) -> float:
+    resolved = video_path.resolve()
+    st = resolved.stat()
+    return _clip_duration_cached(ffprobe_bin, resolved, st.st_mtime_ns, st.st_size)
+
+
 def ffprobe_duration_seconds(ffprobe_bin: str, video_path: Path) -> float:
     def _probe(select: str) -> float | None:
         proc = run_cmd(
@@ -275,18 +482,25 @@ def download_to_path(url: str, dst: Path, force: bool) -> None:
     log(f"Downloading {url}")
     try:
         with urlopen(req, timeout=120) as resp, tmp.open("wb") as f:
-            shutil.copyfileobj(resp, f)
-        tmp.replace(dst)
-    finally:
-        if tmp.exists():
-            tmp.unlink(missing_ok=True)
-
-
-def parse_required_int(clip: dict[str, Any], key: str) -> int:
-    if key not in clip:
-        raise ValueError(f"Missing required key for rawvideo source: {key}")
+            size = getattr(resp, "length", None)
+            if size and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                except OSError:
+                    pass
+            shutil.copyfileobj(resp, f, DOWNLOAD_CHUNK_BYTES)
+            f.truncate()
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def parse_optional_int(clip: dict[str, Any], key: str, positive: bool = True) -> int | None:
+    if key not in clip or clip[key] is None:
+        return None
     value = int(clip[key])
-    if value <= 0:
+    if positive and value <= 0:
         raise ValueError(f"Expected positive value for {key}, got: {clip[key]!r}")
     return value
 
@@ -297,68 +511,135 @@ def parse_optional_float(clip: dict[str, Any], key: str) -> float | None:
     return float(clip[key])
 
 
-def convert_source_to_y4m(
+@dataclass(frozen=True)
+class ClipSpec:
+    name: str
+    output_name: str
+    sources: tuple[str, ...]
+    download_name: str | None
+    input_type: str
+    width: int | None
+    height: int | None
+    pix_fmt: str
+    fps: str
+    start_sec: float | None
+    duration_sec: float | None
+    output_width: int | None
+    output_height: int | None
+    scale_flags: str
+    output_fps: str | None
+
+    @classmethod
+    def from_json(cls, raw: Any, idx: int) -> ClipSpec:
+        if not isinstance(raw, dict):
+            raise ValueError(f"Manifest clip entry #{idx} is not an object.")
+
+        name = sanitize_clip_name(str(raw.get("name", f"clip_{idx}")))
+        output_name = str(raw.get("output_name", f"{name}.y4m"))
+        if not output_name.lower().endswith(".y4m"):
+            output_name += ".y4m"
+
+        input_type = str(raw.get("input_type", "")).strip().lower()
+        if input_type and input_type not in {"rawvideo", "video"}:
+            raise ValueError(f"Unsupported input_type={input_type!r}. Expected 'rawvideo' or 'video'.")
+
+        start_sec = parse_optional_float(raw, "start_sec")
+        duration_sec = parse_optional_float(raw, "duration_sec")
+        if start_sec is not None and start_sec < 0:
+            raise ValueError(f"start_sec must be >= 0, got {start_sec}")
+        if duration_sec is not None and duration_sec <= 0:
+            raise ValueError(f"duration_sec must be > 0, got {duration_sec}")
+
+        output_width = parse_optional_int(raw, "output_width", positive=False)
+        output_height = parse_optional_int(raw, "output_height", positive=False)
+        if (output_width is None) != (output_height is None):
+            raise ValueError("output_width and output_height must either both be set or both be omitted.")
+
+        raw_dims = input_type != "video"
+        download_name = raw.get("download_name")
+        output_fps = raw.get("output_fps")
+        return cls(
+            name=name,
+            output_name=output_name,
+            sources=tuple(clip_source_candidates(raw)),
+            download_name=str(download_name) if download_name is not None else None,
+            input_type=input_type,
+            width=parse_optional_int(raw, "width") if raw_dims else None,
+            height=parse_optional_int(raw, "height") if raw_dims else None,
+            pix_fmt=str(raw.get("pix_fmt", "yuv420p")),
+            fps=str(raw.get("fps", 24)),
+            start_sec=start_sec,
+            duration_sec=duration_sec,
+            output_width=output_width,
+            output_height=output_height,
+            scale_flags=str(raw.get("scale_flags", "bicubic")),
+            output_fps=str(output_fps) if output_fps is not None else None,
+        )
+
+
+def build_convert_cmd(
     ffmpeg_bin: str,
     source_path: Path,
     output_path: Path,
-    clip: dict[str, Any],
-) -> None:
-    input_type = str(clip.get("input_type", "")).strip().lower()
-    if not input_type:
-        input_type = "rawvideo" if source_path.suffix.lower() == ".yuv" else "video"
-    if input_type not in {"rawvideo", "video"}:
-        raise ValueError(f"Unsupported input_type={input_type!r}. Expected 'rawvideo' or 'video'.")
+    clip: ClipSpec,
+    threads: int = 0,
+) -> list[str]:
+    input_type = clip.input_type or ("rawvideo" if source_path.suffix.lower() == ".yuv" else "video")
 
     cmd = [ffmpeg_bin, "-hide_banner", "-y"]
     if input_type == "rawvideo":
-        width = parse_required_int(clip, "width")
-        height = parse_required_int(clip, "height")
-        pix_fmt = str(clip.get("pix_fmt", "yuv420p"))
-        fps = clip.get("fps", 24)
+        for key in ("width", "height"):
+            if getattr(clip, key) is None:
+                raise ValueError(f"Missing required key for rawvideo source: {key}")
         cmd += [
             "-f",
             "rawvideo",
             "-pixel_format",
-            pix_fmt,
+            clip.pix_fmt,
             "-video_size",
-            f"{width}x{height}",
+            f"{clip.width}x{clip.height}",
             "-framerate",
-            str(fps),
+            clip.fps,
             "-i",
             str(source_path),
         ]
     else:
         cmd += ["-i", str(source_path)]
 
-    start_sec = parse_optional_float(clip, "start_sec")
-    duration_sec = parse_optional_float(clip, "duration_sec")
-    if start_sec is not None and start_sec < 0:
-        raise ValueError(f"start_sec must be >= 0, got {start_sec}")
-    if duration_sec is not None and duration_sec <= 0:
-        raise ValueError(f"duration_sec must be > 0, got {duration_sec}")
-
-    if start_sec is not None:
-        cmd += ["-ss", str(start_sec)]
-    if duration_sec is not None:
-        cmd += ["-t", str(duration_sec)]
-
-    output_width = clip.get("output_width")
-    output_height = clip.get("output_height")
-    vf_parts: list[str] = []
-    if (output_width is None) != (output_height is None):
-        raise ValueError("output_width and output_height must either both be set or both be omitted.")
-    if output_width is not None:
-        scale_flags = str(clip.get("scale_flags", "bicubic"))
-        vf_parts.append(f"scale={int(output_width)}:{int(output_height)}:flags={scale_flags}")
-    if vf_parts:
-        cmd += ["-vf", ",".join(vf_parts)]
-
-    output_fps = clip.get("output_fps")
-    if output_fps is not None:
-        cmd += ["-r", str(output_fps)]
+    if clip.start_sec is not None:
+        cmd += ["-ss", str(clip.start_sec)]
+    if clip.duration_sec is not None:
+        cmd += ["-t", str(clip.duration_sec)]
+
+    if clip.output_width is not None:
+        cmd += ["-vf", f"scale={clip.output_width}:{clip.output_height}:flags={clip.scale_flags}"]
 
+    if clip.output_fps is not None:
+        cmd += ["-r", clip.output_fps]
+
+    if threads > 0:
+        cmd += ["-threads", str(threads)]
     cmd += ["-map", "0:v:0", "-pix_fmt", "yuv420p", str(output_path)]
-    run_cmd(cmd)
+    return cmd
+
+
+def conversion_cache_key(source_path: Path, convert_cmd: list[str]) -> str:
+    key_src = json.dumps({"src_mtime": source_path.stat().st_mtime_ns, "args": convert_cmd[1:]}, sort_keys=True)
+    return hashlib.blake2b(key_src.encode(), digest_size=8).hexdigest()
+
+
+def load_prepared_cache_keys(manifest_path: Path) -> dict[str, str]:
+    if not manifest_path.exists():
+        return {}
+    try:
+        prev = json_loads(manifest_path.read_bytes())
+    except ValueError:
+        return {}
+    return {
+        str(c["clip_name"]): str(c["cache_key"])
+        for c in prev.get("clips", [])
+        if isinstance(c, dict) and "clip_name" in c and "cache_key" in c
+    }
 
 
 def cmd_prepare_real(args: argparse.Namespace) -> int:
@@ -384,24 +665,17 @@ def cmd_prepare_real(args: argparse.Namespace) -> int:
     if args.max_clips > 0:
         clips = clips[: args.max_clips]
 
-    results: list[dict[str, Any]] = []
+    planned: list[tuple[int, ClipSpec, Path, Path, str]] = []
+    downloads: dict[Path, str] = {}
     seen_outputs: set[str] = set()
     for idx, raw_clip in enumerate(clips, start=1):
-        if not isinstance(raw_clip, dict):
-            raise ValueError(f"Manifest clip entry #{idx} is not an object.")
-        clip = dict(raw_clip)
+        clip = ClipSpec.from_json(raw_clip, idx)
+        if clip.output_name in seen_outputs:
+            raise ValueError(f"Duplicate output clip name in manifest: {clip.output_name}")
+        seen_outputs.add(clip.output_name)
 
-        clip_name = sanitize_clip_name(str(clip.get("name", f"clip_{idx}")))
-        output_name = str(clip.get("output_name", f"{clip_name}.y4m"))
-        if not output_name.lower().endswith(".y4m"):
-            output_name += ".y4m"
-        if output_name in seen_outputs:
-            raise ValueError(f"Duplicate output clip name in manifest: {output_name}")
-        seen_outputs.add(output_name)
-
-        output_path = out_dir / output_name
-        candidates = clip_source_candidates(clip)
-        local_source, url_source = choose_clip_source(candidates, manifest_path.parent)
+        output_path = out_dir / clip.output_name
+        local_source, url_source = choose_clip_source(list(clip.sources), manifest_path.parent)
 
         if local_source is not None:
             source_path = local_source
@@ -409,27 +683,46 @@ def cmd_prepare_real(args: argparse.Namespace) -> int:
         else:
             assert url_source is not None
             parsed = Path(urlparse(url_source).path).name
-            download_name = str(clip.get("download_name", parsed if parsed else f"{clip_name}.bin"))
+            download_name = clip.download_name or parsed or f"{clip.name}.bin"
             source_path = cache_dir / download_name
-            download_to_path(url_source, source_path, args.force_download)
+            downloads.setdefault(source_path, url_source)
             source_info = url_source
+        planned.append((idx, clip, output_path, source_path, source_info))
 
-        if output_path.exists() and not args.force_convert:
+    if downloads:
+        download_jobs = args.download_jobs if args.download_jobs > 0 else 4
+        with ThreadPoolExecutor(max_workers=min(download_jobs, len(downloads))) as pool:
+            futures = [
+                pool.submit(download_to_path, url, dst, args.force_download) for dst, url in downloads.items()
+            ]
+            for fut in as_completed(futures):
+                fut.result()
+
+    prev_cache_keys = load_prepared_cache_keys(out_dir / "prepared_manifest.json")
+
+    def prepare_one(idx: int, clip: ClipSpec, output_path: Path, source_path: Path, source_info: str) -> dict[str, Any]:
+        cache_key = conversion_cache_key(source_path, build_convert_cmd(args.ffmpeg, source_path, output_path, clip))
+        if output_path.exists() and not args.force_convert and prev_cache_keys.get(output_path.name) == cache_key:
             log(f"Reusing prepared clip: {output_path.name}")
         else:
             log(f"[{idx}/{len(clips)}] Preparing {output_path.name}")
-            convert_source_to_y4m(args.ffmpeg, source_path, output_path, clip)
+            run_cmd(
+                build_convert_cmd(args.ffmpeg, source_path, output_path, clip, args.ffmpeg_threads_per_job),
+                text=False,
+            )
 
-        duration_s = ffprobe_duration_seconds(args.ffprobe, output_path)
-        results.append(
-            {
-                "clip_name": output_path.name,
-                "clip_path": str(output_path),
-                "source_path": str(source_path),
-                "source": source_info,
-                "duration_s": duration_s,
-            }
-        )
+        return {
+            "clip_name": output_path.name,
+            "clip_path": str(output_path),
+            "source_path": str(source_path),
+            "source": source_info,
+            "duration_s": clip_duration_seconds(args.ffprobe, output_path),
+            "cache_key": cache_key,
+        }
+
+    convert_jobs = args.convert_jobs if args.convert_jobs > 0 else (os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=convert_jobs) as pool:
+        results = list(pool.map(lambda plan: prepare_one(*plan), planned))
 
     payload = {
         "metadata": {
@@ -443,7 +736,7 @@ def cmd_prepare_real(args: argparse.Namespace) -> int:
         },
         "clips": results,
     }
-    (out_dir / "prepared_manifest.json").write_text(json.dumps(payload, indent=2))
+    dump_json(out_dir / "prepared_manifest.json", payload)
     write_csv(out_dir / "prepared_manifest.csv", results)
 
     log(f"Prepared {len(results)} clips at {out_dir}")
@@ -452,10 +745,7 @@ def cmd_prepare_real(args: argparse.Namespace) -> int:
 
 
 def parse_psnr(ffmpeg_output: str) -> dict[str, float | None]:
-    m = re.search(
-        r"PSNR y:(?P<y>[-+A-Za-z0-9.]+)\s+u:(?P<u>[-+A-Za-z0-9.]+)\s+v:(?P<v>[-+A-Za-z0-9.]+)\s+average:(?P<avg>[-+A-Za-z0-9.]+)",
-        ffmpeg_output,
-    )
+    m = PSNR_RE.search(ffmpeg_output)
     if not m:
         raise RuntimeError(f"Could not parse PSNR output:\n{ffmpeg_output}")
     return {
@@ -467,10 +757,7 @@ def parse_psnr(ffmpeg_output: str) -> dict[str, float | None]:
 
 
 def parse_ssim(ffmpeg_output: str) -> dict[str, float | None]:
-    m = re.search(
-        r"SSIM Y:(?P<y>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+U:(?P<u>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+V:(?P<v>[-+A-Za-z0-9.]+)\s+\([^)]+\)\s+All:(?P<all>[-+A-Za-z0-9.]+)",
-        ffmpeg_output,
-    )
+    m = SSIM_RE.search(ffmpeg_output)
     if not m:
         raise RuntimeError(f"Could not parse SSIM output:\n{ffmpeg_output}")
     return {
@@ -481,202 +768,235 @@ def parse_ssim(ffmpeg_output: str) -> dict[str, float | None]:
     }
 
 
-def run_psnr(ffmpeg_bin: str, decoded_y4m: Path, ref_y4m: Path) -> dict[str, float | None]:
-    proc = run_cmd(
-        [
-            ffmpeg_bin,
-            "-hide_banner",
-            "-nostats",
-            "-i",
-            str(decoded_y4m),
-            "-i",
-            str(ref_y4m),
-            "-lavfi",
-            "[0:v]setpts=PTS-STARTPTS[dist];[1:v]setpts=PTS-STARTPTS[ref];[dist][ref]psnr",
-            "-f",
-            "null",
-            "-",
-        ]
-    )
-    return parse_psnr(proc.stdout + "\n" + proc.stderr)
-
-
-def run_ssim(ffmpeg_bin: str, decoded_y4m: Path, ref_y4m: Path) -> dict[str, float | None]:
-    proc = run_cmd(
-        [
-            ffmpeg_bin,
-            "-hide_banner",
-            "-nostats",
-            "-i",
-            str(decoded_y4m),
-            "-i",
-            str(ref_y4m),
-            "-lavfi",
-            "[0:v]setpts=PTS-STARTPTS[dist];[1:v]setpts=PTS-STARTPTS[ref];[dist][ref]ssim",
-            "-f",
-            "null",
-            "-",
-        ]
-    )
-    return parse_ssim(proc.stdout + "\n" + proc.stderr)
+def ffmpeg_thread_args(threads: int) -> list[str]:
+    return ["-filter_threads", str(threads)] if threads > 0 else []
 
 
 def parse_vmaf_json(vmaf_json_path: Path) -> float | None:
     if not vmaf_json_path.exists():
         return None
-    data = json.loads(vmaf_json_path.read_text())
-    pooled = data.get("pooled_metrics", {})
-    vmaf = pooled.get("vmaf", {})
-    mean = vmaf.get("mean")
+    data = json_loads(vmaf_json_path.read_bytes())
+    mean = data.get("pooled_metrics", {}).get("vmaf", {}).get("mean")
     if mean is not None:
-        return safe_float(str(mean))
+        return safe_float(mean)
 
     frames = data.get("frames", [])
     vals: list[float] = []
     for frame in frames:
         metrics = frame.get("metrics", {})
-        val = safe_float(str(metrics.get("vmaf")))
+        val = safe_float(metrics.get("vmaf"))
         if val is not None and math.isfinite(val):
             vals.append(val)
     if not vals:
         return None
-    return sum(vals) / len(vals)
+    return fmean(vals)
 
 
-def run_vmaf(
+def build_metrics_cmd(
     ffmpeg_bin: str,
-    decoded_y4m: Path,
+    decoded_input: list[str],
     ref_y4m: Path,
-    vmaf_json_path: Path,
+    vmaf_json_path: Path | None,
     model_path: Path | None,
     threads: int,
     subsample: int,
-) -> float | None:
-    vmaf_json_path.parent.mkdir(parents=True, exist_ok=True)
-
-    opts = [
-        f"log_fmt=json",
-        f"log_path={vmaf_json_path}",
-        f"n_threads={threads}",
-        f"n_subsample={subsample}",
+    ffmpeg_threads: int = 0,
+) -> list[str]:
+    branches = 3 if vmaf_json_path is not None else 2
+    dist_labels = "".join(f"[d{i}]" for i in range(branches))
+    ref_labels = "".join(f"[r{i}]" for i in range(branches))
+    filters = [
+        f"[0:v]setpts=PTS-STARTPTS,split={branches}{dist_labels}",
+        f"[1:v]setpts=PTS-STARTPTS,split={branches}{ref_labels}",
+        "[d0][r0]psnr",
+        "[d1][r1]ssim",
     ]
-    if model_path:
-        opts.append(f"model=path={model_path}")
+    if vmaf_json_path is not None:
+        vmaf_json_path.parent.mkdir(parents=True, exist_ok=True)
+        opts = [
+            "log_fmt=json",
+            f"log_path={vmaf_json_path}",
+            f"n_threads={threads}",
+            f"n_subsample={subsample}",
+        ]
+        if model_path:
+            opts.append(f"model=path={model_path}")
+        filters.append(f"[d2][r2]libvmaf={':'.join(opts)}")
+
+    return [
+        ffmpeg_bin,
+        "-hide_banner",
+        "-nostats",
+        *ffmpeg_thread_args(ffmpeg_threads),
+        *decoded_input,
+        "-i",
+        str(ref_y4m),
+        "-lavfi",
+        ";".join(filters),
+        "-f",
+        "null",
+        "-",
+    ]
+
+
+def parse_metrics_output(
+    proc: subprocess.CompletedProcess[str],
+    vmaf_json_path: Path | None,
+) -> dict[str, float | None]:
+    output = proc.stdout + "\n" + proc.stderr
+    metrics: dict[str, float | None] = {}
+    metrics.update(parse_psnr(output))
+    metrics.update(parse_ssim(output))
+    metrics["vmaf"] = parse_vmaf_json(vmaf_json_path) if vmaf_json_path is not None else None
+    return metrics
 
-    filter_expr = (
-        "[0:v]setpts=PTS-STARTPTS[dist];"
-        "[1:v]setpts=PTS-STARTPTS[ref];"
-        f"[dist][ref]libvmaf={':'.join(opts)}"
+
+def run_all_metrics(
+    ffmpeg_bin: str,
+    decoded_y4m: Path,
+    ref_y4m: Path,
+    vmaf_json_path: Path | None,
+    model_path: Path | None,
+    threads: int,
+    subsample: int,
+    ffmpeg_threads: int = 0,
+) -> dict[str, float | None]:
+    cmd = build_metrics_cmd(
+        ffmpeg_bin,
+        ["-i", str(decoded_y4m)],
+        ref_y4m,
+        vmaf_json_path,
+        model_path,
+        threads,
+        subsample,
+        ffmpeg_threads,
     )
+    return parse_metrics_output(run_cmd(cmd), vmaf_json_path)
 
-    run_cmd(
-        [
-            ffmpeg_bin,
-            "-hide_banner",
-            "-nostats",
-            "-i",
-            str(decoded_y4m),
-            "-i",
-            str(ref_y4m),
-            "-lavfi",
-            filter_expr,
-            "-f",
-            "null",
-            "-",
-        ]
+
+def run_piped_metrics(
+    decode_cmd: list[str],
+    ffmpeg_bin: str,
+    ref_y4m: Path,
+    vmaf_json_path: Path | None,
+    model_path: Path | None,
+    threads: int,
+    subsample: int,
+    ffmpeg_threads: int = 0,
+) -> dict[str, float | None]:
+    cmd = build_metrics_cmd(
+        ffmpeg_bin,
+        ["-f", "yuv4mpegpipe", "-i", "pipe:0"],
+        ref_y4m,
+        vmaf_json_path,
+        model_path,
+        threads,
+        subsample,
+        ffmpeg_threads,
     )
-    return parse_vmaf_json(vmaf_json_path)
+    return parse_metrics_output(run_pipeline(decode_cmd, cmd), vmaf_json_path)
 
 
 def write_csv(path: Path, rows: list[dict[str, Any]]) -> None:
     if not rows:
         path.write_text("")
         return
-    all_keys: set[str] = set()
-    for r in rows:
-        all_keys.update(r.keys())
-    keys = sorted(all_keys)
+    keys = list(dict.fromkeys(k for r in rows for k in r))
     with path.open("w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+        writer = csv.writer(f)
+        writer.writerow(keys)
+        writer.writerows([r.get(k, "") for k in keys] for r in rows)
 
 
 def row_key(row: dict[str, Any]) -> tuple[str, int]:
     return (str(row["clip_name"]), int(row["q"]))
 
 
-def linear_interp(xs: list[float], ys: list[float], x: float) -> float | None:
+def linear_interp_sweep(xs: list[float], ys: list[float], grid: list[float]) -> list[float | None]:
     if len(xs) < 2:
-        return None
-    if x < xs[0] or x > xs[-1]:
-        return None
-    if x == xs[0]:
-        return ys[0]
-    if x == xs[-1]:
-        return ys[-1]
-    for i in range(1, len(xs)):
-        if x <= xs[i]:
+        return [None] * len(grid)
+    out: list[float | None] = []
+    x_first, x_last = xs[0], xs[-1]
+    i = 1
+    for x in grid:
+        if x < x_first or x > x_last:
+            out.append(None)
+        elif x == x_first:
+            out.append(ys[0])
+        elif x == x_last:
+            out.append(ys[-1])
+        else:
+            while x > xs[i]:
+                i += 1
             x0, x1 = xs[i - 1], xs[i]
             y0, y1 = ys[i - 1], ys[i]
-            if x1 == x0:
-                return y0
-            t = (x - x0) / (x1 - x0)
-            return y0 + t * (y1 - y0)
-    return None
+            out.append(y0 if x1 == x0 else y0 + (x - x0) / (x1 - x0) * (y1 - y0))
+    return out
+
+
+def sample_grid(lo: float, hi: float, samples: int) -> list[float]:
+    step = hi - lo
+    return [lo + step * (i / (samples - 1)) for i in range(samples)]
+
+
+def mean_interp_delta(
+    a_xs: list[float],
+    a_ys: list[float],
+    t_xs: list[float],
+    t_ys: list[float],
+    grid: list[float],
+) -> float | None:
+    diffs = [
+        b - a
+        for a, b in zip(linear_interp_sweep(a_xs, a_ys, grid), linear_interp_sweep(t_xs, t_ys, grid))
+        if a is not None and b is not None
+    ]
+    if not diffs:
+        return None
+    return fmean(diffs)
 
 
 def bd_rate_percent(
-    anchor_rates: list[float],
+    anchor_log_rates: list[float],
     anchor_quality: list[float],
-    test_rates: list[float],
+    test_log_rates: list[float],
     test_quality: list[float],
     samples: int = 200,
 ) -> float | None:
-    if len(anchor_rates) < 2 or len(test_rates) < 2:
+    if len(anchor_log_rates) < 2 or len(test_log_rates) < 2:
         return None
 
-    a_pairs = sorted(zip(anchor_quality, anchor_rates), key=lambda x: x[0])
-    t_pairs = sorted(zip(test_quality, test_rates), key=lambda x: x[0])
+    a_pairs = sorted(zip(anchor_quality, anchor_log_rates), key=lambda x: x[0])
+    t_pairs = sorted(zip(test_quality, test_log_rates), key=lambda x: x[0])
 
     a_q = [p[0] for p in a_pairs]
-    a_lr = [math.log(p[1]) for p in a_pairs]
+    a_lr = [p[1] for p in a_pairs]
     t_q = [p[0] for p in t_pairs]
-    t_lr = [math.log(p[1]) for p in t_pairs]
+    t_lr = [p[1] for p in t_pairs]
 
     q_min = max(min(a_q), min(t_q))
     q_max = min(max(a_q), max(t_q))
     if q_max <= q_min:
         return None
 
-    diffs: list[float] = []
-    for i in range(samples):
-        q = q_min + (q_max - q_min) * (i / (samples - 1))
-        a = linear_interp(a_q, a_lr, q)
-        b = linear_interp(t_q, t_lr, q)
-        if a is None or b is None:
-            continue
-        diffs.append(b - a)
-    if not diffs:
+    avg = mean_interp_delta(a_q, a_lr, t_q, t_lr, sample_grid(q_min, q_max, samples))
+    if avg is None:
         return None
-
-    avg = sum(diffs) / len(diffs)
     return (math.exp(avg) - 1.0) * 100.0
 
 
 def bd_quality_delta(
-    anchor_rates: list[float],
+    anchor_log_rates: list[float],
     anchor_quality: list[float],
-    test_rates: list[float],
+    test_log_rates: list[float],
     test_quality: list[float],
     samples: int = 200,
 ) -> float | None:
-    if len(anchor_rates) < 2 or len(test_rates) < 2:
+    if len(anchor_log_rates) < 2 or len(test_log_rates) < 2:
         return None
 
-    a_pairs = sorted((math.log(r), q) for r, q in zip(anchor_rates, anchor_quality))
-    t_pairs = sorted((math.log(r), q) for r, q in zip(test_rates, test_quality))
+    a_pairs = sorted(zip(anchor_log_rates, anchor_quality))
+    t_pairs = sorted(zip(test_log_rates, test_quality))
 
     a_lr = [p[0] for p in a_pairs]
     a_q = [p[1] for p in a_pairs]
@@ -688,18 +1008,7 @@ def bd_quality_delta(
     if lr_max <= lr_min:
         return None
 
-    deltas: list[float] = []
-    for i in range(samples):
-        lr = lr_min + (lr_max - lr_min) * (i / (samples - 1))
-        qa = linear_interp(a_lr, a_q, lr)
-        qb = linear_interp(t_lr, t_q, lr)
-        if qa is None or qb is None:
-            continue
-        deltas.append(qb - qa)
-    if not deltas:
-        return None
-
-    return sum(deltas) / len(deltas)
+    return mean_interp_delta(a_lr, a_q, t_lr, t_q, sample_grid(lr_min, lr_max, samples))
 
 
 def cmd_generate_clips(args: argparse.Namespace) -> int:
@@ -734,13 +1043,119 @@ def cmd_generate_clips(args: argparse.Namespace) -> int:
                 "-pix_fmt",
                 "yuv420p",
                 str(clip_path),
-            ]
+            ],
+            text=False,
         )
 
     log(f"Generated {len(specs)} clips at {out_dir}")
     return 0
 
 
+def run_job(
+    clip: Path,
+    q: int,
+    duration_s: float,
+    progress: str,
+    *,
+    encoder_bin: str,
+    dav1d: str,
+    ffmpeg_bin: str,
+    ivf_dir: Path,
+    dec_dir: Path,
+    logs_dir: Path,
+    enable_vmaf: bool,
+    model_path: Path | None,
+    vmaf_threads: int,
+    vmaf_subsample: int,
+    per_job_threads: int,
+    keep_decoded: bool,
+    source: Path | None = None,
+) -> dict[str, Any]:
+    base_name = f"{clip.stem}_q{q}"
+    ivf_path = ivf_dir / f"{base_name}.ivf"
+    decoded_path = dec_dir / f"{base_name}.y4m"
+    vmaf_log = logs_dir / f"{base_name}.vmaf.json"
+    clip_s, ivf_s, dec_s = str(clip), str(ivf_path), str(decoded_path)
+    source = source or clip
+    source_s = str(source)
+
+    log(f"{progress} {clip.name} q={q}")
+    row: dict[str, Any] = {
+        "clip_name": clip.name,
+        "clip_path": clip_s,
+        "q": q,
+        "duration_s": duration_s,
+        "status": "ok",
+    }
+
+    dav1d_threads = ["--threads", str(per_job_threads)] if per_job_threads > 0 else []
+    try:
+        tool_usage: dict[str, int] = {}
+
+        def scan_tool_usage(line: str) -> None:
+            if not tool_usage and "tool_usage " in line:
+                tool_usage.update(parse_tool_usage_from_stderr(line) or {})
+
+        t0 = time.perf_counter()
+        enc = run_cmd_streaming(
+            [encoder_bin, source_s, "-o", ivf_s, "-q", str(q)],
+            scan_tool_usage,
+        )
+        t1 = time.perf_counter()
+        row["encode_sec"] = t1 - t0
+        row["encoder_stderr"] = enc.stderr.strip()
+        row.update(tool_usage)
+        row["ivf_path"] = ivf_s
+        row["ivf_size_bytes"] = ivf_path.stat().st_size
+        row["bitrate_kbps"] = (row["ivf_size_bytes"] * 8.0) / (duration_s * 1000.0)
+
+        vmaf_json = vmaf_log if enable_vmaf else None
+        if keep_decoded:
+            t2 = time.perf_counter()
+            run_cmd([dav1d, *dav1d_threads, "-i", ivf_s, "-o", dec_s], text=False)
+            t3 = time.perf_counter()
+            row["decode_sec"] = t3 - t2
+            row["decoded_path"] = dec_s
+
+            t4 = time.perf_counter()
+            row.update(
+                run_all_metrics(
+                    ffmpeg_bin,
+                    decoded_path,
+                    source,
+                    vmaf_json,
+                    model_path,
+                    vmaf_threads,
+                    vmaf_subsample,
+                    per_job_threads,
+                )
+            )
+        else:
+            row["decode_sec"] = None
+            row["decoded_path"] = None
+
+            t4 = time.perf_counter()
+            row.update(
+                run_piped_metrics(
+                    [dav1d, *dav1d_threads, "-i", ivf_s, "--muxer", "y4m", "-o", "-"],
+                    ffmpeg_bin,
+                    source,
+                    vmaf_json,
+                    model_path,
+                    vmaf_threads,
+                    vmaf_subsample,
+                    per_job_threads,
+                )
+            )
+        t5 = time.perf_counter()
+        row["metric_sec"] = t5 - t4
+    except Exception as e:  # noqa: BLE001
+        row["status"] = "error"
+        row["error"] = str(e)
+        log(f"ERROR for {clip.name} q={q}: {e}")
+    return row
+
+
 def cmd_run(args: argparse.Namespace) -> int:
     clips_dir = Path(args.clips_dir).expanduser().resolve()
     out_root = Path(args.out_dir).expanduser().resolve()
@@ -750,7 +1165,7 @@ def cmd_run(args: argparse.Namespace) -> int:
     ivf_dir = out_dir / "ivf"
     dec_dir = out_dir / "decoded"
     logs_dir = out_dir / "logs"
-    for d in [ivf_dir, dec_dir, logs_dir]:
+    for d in [ivf_dir, logs_dir, *([dec_dir] if args.keep_decoded else [])]:
         d.mkdir(parents=True, exist_ok=True)
 
     ffmpeg_bin = args.ffmpeg
@@ -780,103 +1195,117 @@ def cmd_run(args: argparse.Namespace) -> int:
     if args.max_clips > 0:
         clips = clips[: args.max_clips]
 
-    ffmpeg_ver = run_cmd([ffmpeg_bin, "-version"], check=False).stdout.splitlines()
-    dav1d_ver = run_cmd([str(dav1d), "--version"], check=False).stdout.strip()
-    git_head = run_cmd(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=False).stdout.strip()
-    git_status = run_cmd(["git", "status", "--porcelain"], cwd=REPO_ROOT, check=False).stdout.strip()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        ffmpeg_ver_f = pool.submit(run_cmd, [ffmpeg_bin, "-version"], check=False)
+        dav1d_ver_f = pool.submit(run_cmd, [str(dav1d), "--version"], check=False)
+        if not args.skip_git_meta:
+            git_head_f = pool.submit(run_cmd, ["git", "rev-parse", "HEAD"], check=False, cwd=REPO_ROOT)
+            git_status_f = pool.submit(run_cmd, ["git", "status", "--porcelain"], check=False, cwd=REPO_ROOT)
+    ffmpeg_ver = ffmpeg_ver_f.result().stdout.splitlines()
+    dav1d_ver = dav1d_ver_f.result().stdout.strip()
+    if args.skip_git_meta:
+        git_head, git_dirty = None, None
+    else:
+        git_head = git_head_f.result().stdout.strip()
+        git_dirty = bool(git_status_f.result().stdout.strip())
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    per_job_threads = args.per_job_threads
+    if per_job_threads <= 0 and jobs > 1:
+        per_job_threads = max(1, (os.cpu_count() or 1) // jobs)
+    vmaf_threads = max(1, args.vmaf_threads // jobs) if args.vmaf_threads > 0 else 0
+
+    durations = {clip: clip_duration_seconds(ffprobe_bin, clip) for clip in clips}
+    tasks = [(clip, q) for clip in clips for q in q_values]
+    total_jobs = len(tasks)
+    run_one = functools.partial(
+        run_job,
+        encoder_bin=str(encoder_bin),
+        dav1d=str(dav1d),
+        ffmpeg_bin=ffmpeg_bin,
+        ivf_dir=ivf_dir,
+        dec_dir=dec_dir,
+        logs_dir=logs_dir,
+        enable_vmaf=args.enable_vmaf,
+        model_path=model_path,
+        vmaf_threads=vmaf_threads,
+        vmaf_subsample=args.vmaf_subsample,
+        per_job_threads=per_job_threads,
+        keep_decoded=args.keep_decoded,
+    )
 
-    rows: list[dict[str, Any]] = []
-    total_jobs = len(clips) * len(q_values)
-    job_index = 0
-
-    for clip in clips:
-        duration_s = ffprobe_duration_seconds(ffprobe_bin, clip)
-        for q in q_values:
-            job_index += 1
-            clip_stem = clip.stem
-            base_name = f"{clip_stem}_q{q}"
-            ivf_path = ivf_dir / f"{base_name}.ivf"
-            decoded_path = dec_dir / f"{base_name}.y4m"
-            vmaf_log = logs_dir / f"{base_name}.vmaf.json"
-
-            log(f"[{job_index}/{total_jobs}] {clip.name} q={q}")
-            row: dict[str, Any] = {
-                "clip_name": clip.name,
-                "clip_path": str(clip),
-                "q": q,
-                "duration_s": duration_s,
-                "status": "ok",
-            }
+    stage_dir: Path | None = None
+    if args.stage_refs:
+        shm = Path("/dev/shm")
+        stage_dir = Path(tempfile.mkdtemp(prefix="wav1c-refs-", dir=shm if shm.is_dir() else None))
+    stage_lock = threading.Lock()
+    staged: dict[Path, Any] = {}
+    uses_left = {clip: len(q_values) for clip in clips}
+    stage_pool = ThreadPoolExecutor(max_workers=1)
+
+    def run_staged(clip: Path, q: int, duration_s: float, progress: str) -> dict[str, Any]:
+        if stage_dir is None:
+            return run_one(clip, q, duration_s, progress)
+        with stage_lock:
+            if clip not in staged:
+                staged[clip] = stage_pool.submit(shutil.copyfile, clip, stage_dir / clip.name)
+            copy = staged[clip]
+        try:
+            source = Path(copy.result())
+        except OSError as e:
+            log(f"Could not stage {clip.name} ({e}); reading it in place")
+            source = clip
+        try:
+            return run_one(clip, q, duration_s, progress, source=source)
+        finally:
+            with stage_lock:
+                uses_left[clip] -= 1
+                if uses_left[clip] == 0 and source != clip:
+                    source.unlink(missing_ok=True)
+
+    stop = threading.Event()
+
+    def run_until_failure(clip: Path, q: int, duration_s: float, progress: str) -> dict[str, Any] | None:
+        if stop.is_set():
+            return None
+        row = run_staged(clip, q, duration_s, progress)
+        if row["status"] != "ok" and not args.continue_on_error:
+            stop.set()
+        return row
 
-            try:
-                t0 = time.perf_counter()
-                enc = run_cmd(
-                    [
-                        str(encoder_bin),
-                        str(clip),
-                        "-o",
-                        str(ivf_path),
-                        "-q",
-                        str(q),
-                    ]
-                )
-                t1 = time.perf_counter()
-                row["encode_sec"] = t1 - t0
-                row["encoder_stderr"] = enc.stderr.strip()
-                tool_usage = parse_tool_usage_from_stderr(enc.stderr)
-                if tool_usage:
-                    row.update(tool_usage)
-                row["ivf_path"] = str(ivf_path)
-                row["ivf_size_bytes"] = ivf_path.stat().st_size
-                row["bitrate_kbps"] = (row["ivf_size_bytes"] * 8.0) / (duration_s * 1000.0)
-
-                t2 = time.perf_counter()
-                run_cmd([str(dav1d), "-i", str(ivf_path), "-o", str(decoded_path)])
-                t3 = time.perf_counter()
-                row["decode_sec"] = t3 - t2
-                row["decoded_path"] = str(decoded_path)
-
-                t4 = time.perf_counter()
-                row.update(run_psnr(ffmpeg_bin, decoded_path, clip))
-                row.update(run_ssim(ffmpeg_bin, decoded_path, clip))
-                if args.enable_vmaf:
-                    row["vmaf"] = run_vmaf(
-                        ffmpeg_bin,
-                        decoded_path,
-                        clip,
-                        vmaf_log,
-                        model_path,
-                        args.vmaf_threads,
-                        args.vmaf_subsample,
-                    )
-                else:
-                    row["vmaf"] = None
-                t5 = time.perf_counter()
-                row["metric_sec"] = t5 - t4
-            except Exception as e:  # noqa: BLE001
-                row["status"] = "error"
-                row["error"] = str(e)
-                log(f"ERROR for {clip.name} q={q}: {e}")
-                if not args.continue_on_error:
-                    rows.append(row)
-                    write_csv(out_dir / "results.csv", rows)
-                    (out_dir / "results.json").write_text(
-                        json.dumps(
-                            {
-                                "metadata": {
-                                    "tag": args.tag,
-                                    "created_at_utc": now_iso(),
-                                    "git_head": git_head,
-                                    "git_dirty": bool(git_status),
-                                },
-                                "rows": rows,
-                            },
-                            indent=2,
-                        )
-                    )
-                    return 1
-
-            rows.append(row)
+    results: dict[int, dict[str, Any]] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(run_until_failure, clip, q, durations[clip], f"[{idx}/{total_jobs}]"): idx
+                for idx, (clip, q) in enumerate(tasks, start=1)
+            }
+            for fut in as_completed(futures):
+                row = fut.result()
+                if row is not None:
+                    results[futures[fut]] = row
+    finally:
+        stage_pool.shutdown()
+        if stage_dir is not None:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+    failed = stop.is_set()
+
+    rows = [results[idx] for idx in sorted(results)]
+    if failed:
+        write_csv(out_dir / "results.csv", rows)
+        dump_json(
+            out_dir / "results.json",
+            {
+                "metadata": {
+                    "tag": args.tag,
+                    "created_at_utc": now_iso(),
+                    "git_head": git_head,
+                    "git_dirty": git_dirty,
+                },
+                "rows": rows,
+            },
+        )
+        return 1
 
     summary_by_q: dict[int, dict[str, float]] = {}
     for q in q_values:
@@ -885,11 +1314,11 @@ def cmd_run(args: argparse.Namespace) -> int:
             continue
 
         def avg(key: str) -> float | None:
-            vals = [safe_float(str(r.get(key))) for r in subset]
+            vals = [safe_float(r.get(key)) for r in subset]
             vals = [v for v in vals if v is not None and math.isfinite(v)]
             if not vals:
                 return None
-            return float(sum(vals) / len(vals))
+            return fmean(vals)
 
         summary_by_q[q] = {
             "avg_bitrate_kbps": avg("bitrate_kbps"),
@@ -904,7 +1333,7 @@ def cmd_run(args: argparse.Namespace) -> int:
             "created_at_utc": now_iso(),
             "repo_root": str(REPO_ROOT),
             "git_head": git_head,
-            "git_dirty": bool(git_status),
+            "git_dirty": git_dirty,
             "encoder_bin": str(encoder_bin),
             "dav1d": str(dav1d),
             "dav1d_version": dav1d_ver,
@@ -918,9 +1347,10 @@ def cmd_run(args: argparse.Namespace) -> int:
         "summary_by_q": summary_by_q,
     }
 
-    (out_dir / "results.json").write_text(json.dumps(payload, indent=2))
+    dump_json(out_dir / "results.json", payload)
     write_csv(out_dir / "results.csv", rows)
-    (out_dir / "summary.json").write_text(json.dumps(summary_by_q, indent=2))
+    dump_json(out_dir / "summary.json", summary_by_q)
+    write_decode_cache(out_dir, rows, str(dav1d), dav1d_ver)
 
     ok_count = sum(1 for r in rows if r.get("status") == "ok")
     err_count = len(rows) - ok_count
@@ -929,37 +1359,94 @@ def cmd_run(args: argparse.Namespace) -> int:
     return 0 if err_count == 0 else 2
 
 
+def files_identical(a: Path, b: Path) -> bool:
+    if a.stat().st_size != b.stat().st_size:
+        return False
+    with a.open("rb", buffering=0) as fa, b.open("rb", buffering=0) as fb:
+        while True:
+            chunk = fa.read(COMPARE_CHUNK_BYTES)
+            if chunk != fb.read(COMPARE_CHUNK_BYTES):
+                return False
+            if not chunk:
+                return True
+
+
+def write_decode_cache(out_dir: Path, rows: list[dict[str, Any]], dav1d: str, dav1d_version: str) -> None:
+    ivfs: dict[str, dict[str, Any]] = {}
+    for r in rows:
+        if r.get("status") != "ok" or not r.get("ivf_path"):
+            continue
+        try:
+            st = Path(r["ivf_path"]).stat()
+        except OSError:
+            continue
+        ivfs[r["ivf_path"]] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "decoded_ok": True}
+    dump_json(out_dir / DECODE_CACHE_NAME, {"dav1d": dav1d, "dav1d_version": dav1d_version, "ivfs": ivfs})
+
+
+def cached_decoder(results_path: Path, ivf: Path) -> str | None:
+    cache_path = results_path.parent / DECODE_CACHE_NAME
+    try:
+        cache = json_loads(cache_path.read_bytes())
+        entry = cache["ivfs"][str(ivf)]
+        st = ivf.stat()
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if (
+        isinstance(entry, dict)
+        and entry.get("decoded_ok") is True
+        and entry.get("size") == st.st_size
+        and entry.get("mtime_ns") == st.st_mtime_ns
+        and isinstance(cache.get("dav1d"), str)
+    ):
+        return cache["dav1d"]
+    return None
+
+
 def load_results(path: Path) -> dict[str, Any]:
-    data = json.loads(path.read_text())
+    data = json_loads(path.read_bytes())
     if "rows" not in data:
         raise ValueError(f"Invalid results json (missing rows): {path}")
     return data
 
 
-def resolve_required_tool_fields(spec: str) -> list[str]:
-    if not spec.strip():
-        return []
-    alias = {
-        "uv_non_dc_blocks": "tool_uv_non_dc_blocks",
-        "tool_uv_non_dc_blocks": "tool_uv_non_dc_blocks",
-        "inter_newmv_blocks": "tool_inter_newmv_blocks",
-        "tool_inter_newmv_blocks": "tool_inter_newmv_blocks",
-        "restoration_non_none_units": "tool_restoration_non_none_units",
-        "tool_restoration_non_none_units": "tool_restoration_non_none_units",
-        "seg1_blocks": "tool_seg1_blocks",
-        "tool_seg1_blocks": "tool_seg1_blocks",
-    }
+def load_results_streaming(path: Path) -> dict[str, Any]:
+    assert ijson is not None
+    with path.open("rb") as f:
+        metadata = next(ijson.items(f, "metadata", use_float=True), {})
+    rows: list[dict[str, Any]] = []
+    seen_rows = False
+    with path.open("rb") as f:
+        for r in ijson.items(f, "rows.item", use_float=True):
+            seen_rows = True
+            if r.get("status") == "ok":
+                rows.append({k: v for k, v in r.items() if k in COMPARE_ROW_FIELDS or k.startswith("tool_")})
+    if not seen_rows:
+        return load_results(path)
+    return {"metadata": metadata, "rows": rows}
+
+
+def load_compare_results(path: Path) -> dict[str, Any]:
+    if ijson is not None and path.stat().st_size >= STREAM_RESULTS_MIN_BYTES:
+        try:
+            return load_results_streaming(path)
+        except ijson.JSONError:
+            pass
+    return load_results(path)
+
+
+def parse_tool_usage_fields(spec: str) -> list[str]:
     out: list[str] = []
     for raw in spec.split(","):
-        key = raw.strip()
+        key = raw.strip().removeprefix("tool_")
         if not key:
             continue
-        if key not in alias:
-            valid = ", ".join(sorted(alias.keys()))
-            raise ValueError(f"Unknown tool usage key '{key}'. Valid values: {valid}")
-        canon = alias[key]
-        if canon not in out:
-            out.append(canon)
+        if key not in TOOL_USAGE_COUNTERS:
+            valid = ", ".join(TOOL_USAGE_COUNTERS)
+            raise argparse.ArgumentTypeError(f"Unknown tool usage key '{raw.strip()}'. Valid values: {valid}")
+        field = f"tool_{key}"
+        if field not in out:
+            out.append(field)
     return out
 
 
@@ -989,36 +1476,66 @@ def choose_sanity_key(
     return keys[0]
 
 
+BdCurves = tuple[tuple[list[float], list[float]], tuple[list[float], list[float]]]
+
+
+def bd_points(rows: list[dict[str, Any]]) -> BdCurves:
+    psnr: tuple[list[float], list[float]] = ([], [])
+    vmaf: tuple[list[float], list[float]] = ([], [])
+    appenders = [(metric, lr.append, q.append) for metric, (lr, q) in (("psnr_avg", psnr), ("vmaf", vmaf))]
+    isfinite, log, to_float = math.isfinite, math.log, safe_float
+    for r in rows:
+        get = r.get
+        rate = to_float(get("bitrate_kbps"))
+        if rate is None or not isfinite(rate) or rate <= 0:
+            continue
+        log_rate = log(rate)
+        for metric, lr_append, q_append in appenders:
+            qual = to_float(get(metric))
+            if qual is None or not isfinite(qual):
+                continue
+            lr_append(log_rate)
+            q_append(qual)
+    return psnr, vmaf
+
+
+def bd_for_clip(curves: tuple[BdCurves, BdCurves]) -> tuple[float | None, float | None]:
+    (a_psnr, a_vmaf), (t_psnr, t_vmaf) = curves
+    return bd_rate_percent(*a_psnr, *t_psnr), bd_quality_delta(*a_vmaf, *t_vmaf)
+
+
 def cmd_compare(args: argparse.Namespace) -> int:
     anchor_path = Path(args.anchor).expanduser().resolve()
     test_path = Path(args.test).expanduser().resolve()
     out_path = Path(args.out).expanduser().resolve()
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    anchor = load_results(anchor_path)
-    test = load_results(test_path)
+    anchor = load_compare_results(anchor_path)
+    test = load_compare_results(test_path)
     anchor_rows = [r for r in anchor["rows"] if r.get("status") == "ok"]
     test_rows = [r for r in test["rows"] if r.get("status") == "ok"]
 
     a_map = {row_key(r): r for r in anchor_rows}
     t_map = {row_key(r): r for r in test_rows}
-    keys = sorted(set(a_map.keys()) & set(t_map.keys()))
+    keys = sorted(a_map.keys() & t_map.keys())
     if not keys:
         raise RuntimeError("No overlapping (clip, q) points between anchor and test runs.")
 
-    required_tool_fields = resolve_required_tool_fields(args.require_tool_usage)
-    tool_usage_totals_test: dict[str, int] = {}
-    for field in required_tool_fields:
-        total = 0
+    isfinite, to_float = math.isfinite, safe_float
+
+    required_tool_fields = args.require_tool_usage
+    tool_usage_totals_test = dict.fromkeys(required_tool_fields, 0)
+    if required_tool_fields:
         for row in test_rows:
-            raw = row.get(field)
-            if raw is None:
-                continue
-            value = safe_float(str(raw))
-            if value is None or not math.isfinite(value):
-                continue
-            total += int(round(value))
-        tool_usage_totals_test[field] = total
+            get = row.get
+            for field in required_tool_fields:
+                raw = get(field)
+                if raw is None:
+                    continue
+                value = to_float(raw)
+                if value is None or not isfinite(value):
+                    continue
+                tool_usage_totals_test[field] += int(round(value))
     missing_tool_usage = [f for f, total in tool_usage_totals_test.items() if total <= 0]
     if missing_tool_usage:
         missing_str = ", ".join(missing_tool_usage)
@@ -1037,128 +1554,133 @@ def cmd_compare(args: argparse.Namespace) -> int:
         if not test_ivf.exists():
             raise FileNotFoundError(f"Test ivf_path not found for sanity point {sanity_key}: {test_ivf}")
 
-        if filecmp.cmp(anchor_ivf, test_ivf, shallow=False):
+        if files_identical(anchor_ivf, test_ivf):
             raise RuntimeError(
                 f"Sanity A/B failed for {sanity_key}: candidate IVF is byte-identical to anchor."
             )
 
-        dav1d = Path(args.dav1d).expanduser().resolve() if args.dav1d else find_default_dav1d()
-        if dav1d is None or not dav1d.exists():
-            raise FileNotFoundError(
-                "Sanity decode requested but dav1d was not found. Pass --dav1d or set DAV1D."
-            )
-        with tempfile.TemporaryDirectory(prefix="wav1c_sanity_") as tmp:
-            sanity_out = Path(tmp) / "sanity_decode.y4m"
-            run_cmd([str(dav1d), "-i", str(test_ivf), "-o", str(sanity_out)])
+        decoded_by = None if args.dav1d else cached_decoder(test_path, test_ivf)
+        decode_cached = decoded_by is not None
+        if decoded_by is None:
+            dav1d = Path(args.dav1d).expanduser().resolve() if args.dav1d else find_default_dav1d()
+            if dav1d is None or not dav1d.exists():
+                raise FileNotFoundError(
+                    "Sanity decode requested but dav1d was not found. Pass --dav1d or set DAV1D."
+                )
+            run_cmd([str(dav1d), "--muxer", "null", "-i", str(test_ivf), "-o", os.devnull], text=False)
+            decoded_by = str(dav1d)
 
         sanity_check = {
             "point": {"clip_name": sanity_key[0], "q": sanity_key[1]},
             "anchor_ivf_path": str(anchor_ivf),
             "test_ivf_path": str(test_ivf),
             "ivf_different": True,
-            "dav1d": str(dav1d),
+            "dav1d": decoded_by,
             "dav1d_decode_ok": True,
+            "dav1d_decode_cached": decode_cached,
         }
 
+    delta_fields = [f"delta_{m}" for m in COMPARE_METRICS]
     deltas: list[dict[str, Any]] = []
-    for k in keys:
-        a = a_map[k]
-        t = t_map[k]
-        row = {
-            "clip_name": k[0],
-            "q": k[1],
-            "anchor_bitrate_kbps": a.get("bitrate_kbps"),
-            "test_bitrate_kbps": t.get("bitrate_kbps"),
-            "delta_bitrate_kbps": None,
-            "delta_psnr_avg": None,
-            "delta_ssim_all": None,
-            "delta_vmaf": None,
+    q_sums: dict[int, list[float]] = {}
+    q_counts: dict[int, list[int]] = {}
+    overall_sums = [0.0] * len(COMPARE_METRICS)
+    overall_counts = [0] * len(COMPARE_METRICS)
+    metric_fields = list(enumerate(zip(COMPARE_METRICS, delta_fields)))
+    append_delta = deltas.append
+    csv_path = out_path.with_suffix(".csv")
+    csv_tmp = csv_path.with_suffix(".csv.part")
+    try:
+        with csv_tmp.open("w", newline="", buffering=1 << 16) as csv_file:
+            write_delta = csv.writer(csv_file).writerow
+            write_delta(["clip_name", "q", "anchor_bitrate_kbps", "test_bitrate_kbps", *delta_fields])
+            for k in keys:
+                a_get = a_map[k].get
+                t_get = t_map[k].get
+                row = {
+                    "clip_name": k[0],
+                    "q": k[1],
+                    "anchor_bitrate_kbps": a_get("bitrate_kbps"),
+                    "test_bitrate_kbps": t_get("bitrate_kbps"),
+                }
+                row.update(dict.fromkeys(delta_fields))
+                sums = q_sums.setdefault(k[1], [0.0] * len(COMPARE_METRICS))
+                counts = q_counts.setdefault(k[1], [0] * len(COMPARE_METRICS))
+                for i, (metric, field) in metric_fields:
+                    av = to_float(a_get(metric))
+                    tv = to_float(t_get(metric))
+                    if av is None or tv is None or not (isfinite(av) and isfinite(tv)):
+                        continue
+                    delta = row[field] = tv - av
+                    if not isfinite(delta):
+                        continue
+                    sums[i] += delta
+                    counts[i] += 1
+                    overall_sums[i] += delta
+                    overall_counts[i] += 1
+                append_delta(row)
+                write_delta(row.values())
+
+        def means(sums: list[float], counts: list[int]) -> dict[str, float | None]:
+            return {f: (sums[i] / counts[i]) if counts[i] else None for i, f in enumerate(delta_fields)}
+
+        by_q = {q: means(q_sums[q], q_counts[q]) for q in sorted(q_sums)}
+        overall = means(overall_sums, overall_counts)
+
+        bd_psnr: dict[str, float | None] = {}
+        bd_vmaf: dict[str, float | None] = {}
+        a_by_clip: collections.defaultdict[str, list[dict[str, Any]]] = collections.defaultdict(list)
+        t_by_clip: collections.defaultdict[str, list[dict[str, Any]]] = collections.defaultdict(list)
+        for k in keys:
+            a_by_clip[k[0]].append(a_map[k])
+            t_by_clip[k[0]].append(t_map[k])
+        clips = list(a_by_clip)
+        curves = [(bd_points(a_by_clip[clip]), bd_points(t_by_clip[clip])) for clip in clips]
+
+        bd_jobs = args.bd_jobs if args.bd_jobs > 0 else (os.cpu_count() or 1)
+        if bd_jobs > 1 and len(clips) > 1:
+            with ProcessPoolExecutor(max_workers=min(bd_jobs, len(clips))) as pool:
+                bd_results = list(pool.map(bd_for_clip, curves, chunksize=max(1, len(clips) // (4 * bd_jobs))))
+        else:
+            bd_results = [bd_for_clip(c) for c in curves]
+        for clip, (bd_rate, bd_quality) in zip(clips, bd_results):
+            bd_psnr[clip] = bd_rate
+            bd_vmaf[clip] = bd_quality
+
+        avg_bd_rate_psnr = None
+        vals_bd = [v for v in bd_psnr.values() if v is not None and isfinite(v)]
+        if vals_bd:
+            avg_bd_rate_psnr = fmean(vals_bd)
+
+        avg_bd_vmaf = None
+        vals_bdv = [v for v in bd_vmaf.values() if v is not None and isfinite(v)]
+        if vals_bdv:
+            avg_bd_vmaf = fmean(vals_bdv)
+
+        payload = {
+            "metadata": {
+                "created_at_utc": now_iso(),
+                "anchor": str(anchor_path),
+                "test": str(test_path),
+                "anchor_tag": anchor.get("metadata", {}).get("tag"),
+                "test_tag": test.get("metadata", {}).get("tag"),
+                "required_tool_usage_fields": required_tool_fields,
+            },
+            "overall_avg_deltas": overall,
+            "per_q_avg_deltas": by_q,
+            "per_point_deltas": deltas,
+            "bd_rate_psnr_percent_per_clip": bd_psnr,
+            "bd_vmaf_per_clip": bd_vmaf,
+            "avg_bd_rate_psnr_percent": avg_bd_rate_psnr,
+            "avg_bd_vmaf": avg_bd_vmaf,
+            "tool_usage_totals_test": tool_usage_totals_test,
+            "sanity_check": sanity_check,
         }
-        for metric in ["bitrate_kbps", "psnr_avg", "ssim_all", "vmaf"]:
-            av = safe_float(str(a.get(metric)))
-            tv = safe_float(str(t.get(metric)))
-            if av is not None and tv is not None and math.isfinite(av) and math.isfinite(tv):
-                row[f"delta_{metric}"] = tv - av
-        deltas.append(row)
-
-    by_q: dict[int, dict[str, float | None]] = {}
-    for q in sorted({int(d["q"]) for d in deltas}):
-        subset = [d for d in deltas if int(d["q"]) == q]
-        by_q[q] = {}
-        for metric in ["delta_bitrate_kbps", "delta_psnr_avg", "delta_ssim_all", "delta_vmaf"]:
-            vals = [safe_float(str(r.get(metric))) for r in subset]
-            vals = [v for v in vals if v is not None and math.isfinite(v)]
-            by_q[q][metric] = (sum(vals) / len(vals)) if vals else None
-
-    overall: dict[str, float | None] = {}
-    for metric in ["delta_bitrate_kbps", "delta_psnr_avg", "delta_ssim_all", "delta_vmaf"]:
-        vals = [safe_float(str(r.get(metric))) for r in deltas]
-        vals = [v for v in vals if v is not None and math.isfinite(v)]
-        overall[metric] = (sum(vals) / len(vals)) if vals else None
-
-    bd_psnr: dict[str, float | None] = {}
-    bd_vmaf: dict[str, float | None] = {}
-    clips = sorted({k[0] for k in keys})
-    for clip in clips:
-        a_pts = [a_map[k] for k in keys if k[0] == clip]
-        t_pts = [t_map[k] for k in keys if k[0] == clip]
-
-        def points(rows: list[dict[str, Any]], metric: str) -> tuple[list[float], list[float]]:
-            rates: list[float] = []
-            quals: list[float] = []
-            for r in rows:
-                rate = safe_float(str(r.get("bitrate_kbps")))
-                qual = safe_float(str(r.get(metric)))
-                if rate is None or qual is None:
-                    continue
-                if not (math.isfinite(rate) and math.isfinite(qual)):
-                    continue
-                if rate <= 0:
-                    continue
-                rates.append(rate)
-                quals.append(qual)
-            return rates, quals
-
-        a_r_psnr, a_q_psnr = points(a_pts, "psnr_avg")
-        t_r_psnr, t_q_psnr = points(t_pts, "psnr_avg")
-        bd_psnr[clip] = bd_rate_percent(a_r_psnr, a_q_psnr, t_r_psnr, t_q_psnr)
-
-        a_r_vmaf, a_q_vmaf = points(a_pts, "vmaf")
-        t_r_vmaf, t_q_vmaf = points(t_pts, "vmaf")
-        bd_vmaf[clip] = bd_quality_delta(a_r_vmaf, a_q_vmaf, t_r_vmaf, t_q_vmaf)
 
-    avg_bd_rate_psnr = None
-    vals_bd = [v for v in bd_psnr.values() if v is not None and math.isfinite(v)]
-    if vals_bd:
-        avg_bd_rate_psnr = sum(vals_bd) / len(vals_bd)
-
-    avg_bd_vmaf = None
-    vals_bdv = [v for v in bd_vmaf.values() if v is not None and math.isfinite(v)]
-    if vals_bdv:
-        avg_bd_vmaf = sum(vals_bdv) / len(vals_bdv)
-
-    payload = {
-        "metadata": {
-            "created_at_utc": now_iso(),
-            "anchor": str(anchor_path),
-            "test": str(test_path),
-            "anchor_tag": anchor.get("metadata", {}).get("tag"),
-            "test_tag": test.get("metadata", {}).get("tag"),
-            "required_tool_usage_fields": required_tool_fields,
-        },
-        "overall_avg_deltas": overall,
-        "per_q_avg_deltas": by_q,
-        "per_point_deltas": deltas,
-        "bd_rate_psnr_percent_per_clip": bd_psnr,
-        "bd_vmaf_per_clip": bd_vmaf,
-        "avg_bd_rate_psnr_percent": avg_bd_rate_psnr,
-        "avg_bd_vmaf": avg_bd_vmaf,
-        "tool_usage_totals_test": tool_usage_totals_test,
-        "sanity_check": sanity_check,
-    }
-
-    out_path.write_text(json.dumps(payload, indent=2))
-    write_csv(out_path.with_suffix(".csv"), deltas)
+        dump_json(out_path, payload)
+        os.replace(csv_tmp, csv_path)
+    finally:
+        csv_tmp.unlink(missing_ok=True)
 
     print(json.dumps(payload["overall_avg_deltas"], indent=2))
     print(f"avg_bd_rate_psnr_percent={avg_bd_rate_psnr}")
@@ -1224,6 +1746,24 @@ def build_parser() -> argparse.ArgumentParser:
     p_prep.add_argument("--max-clips", type=int, default=0, help="Limit number of manifest entries.")
     p_prep.add_argument("--force-download", action="store_true", help="Redownload URL sources.")
     p_prep.add_argument("--force-convert", action="store_true", help="Rebuild output .y4m clips.")
+    p_prep.add_argument(
+        "--convert-jobs",
+        type=int,
+        default=1,
+        help="Number of ffmpeg conversions to run in parallel (0 = CPU count).",
+    )
+    p_prep.add_argument(
+        "--ffmpeg-threads-per-job",
+        type=int,
+        default=0,
+        help="Pass -threads N to each conversion ffmpeg (0 = ffmpeg default).",
+    )
+    p_prep.add_argument(
+        "--download-jobs",
+        type=int,
+        default=4,
+        help="Number of URL sources to download concurrently (0 = default of 4).",
+    )
     p_prep.set_defaults(func=cmd_prepare_real)
 
     p_run = sub.add_parser("run", help="Run encode/decode/metrics for a set of clips and Q values.")
@@ -1243,6 +1783,39 @@ def build_parser() -> argparse.ArgumentParser:
     p_run.add_argument("--vmaf-threads", type=int, default=0)
     p_run.add_argument("--vmaf-subsample", type=int, default=1)
     p_run.add_argument("--continue-on-error", action="store_true")
+    p_run.add_argument(
+        "--stage-refs",
+        action="store_true",
+        help=(
+            "Copy each source clip to /dev/shm (or the temp dir) while its Q jobs run, so the encoder and "
+            "metric passes read it from memory instead of the clips directory."
+        ),
+    )
+    p_run.add_argument(
+        "--skip-git-meta",
+        action="store_true",
+        help="Do not record git HEAD/dirty state in results metadata (saves two git calls on frequent reruns).",
+    )
+    p_run.add_argument(
+        "--keep-decoded",
+        action="store_true",
+        help=(
+            "Write decoded .y4m files to disk and measure them separately. By default dav1d output is "
+            "piped straight into ffmpeg and decode time is included in metric_sec."
+        ),
+    )
+    p_run.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of (clip, q) jobs to run in parallel (0 = CPU count).",
+    )
+    p_run.add_argument(
+        "--per-job-threads",
+        type=int,
+        default=0,
+        help="Threads for dav1d and ffmpeg filters in each job (0 = CPU count / jobs when jobs > 1).",
+    )
     p_run.set_defaults(func=cmd_run)
 
     p_cmp = sub.add_parser("compare", help="Compare two run result json files.")
@@ -1251,10 +1824,11 @@ def build_parser() -> argparse.ArgumentParser:
     p_cmp.add_argument("--out", required=True, help="Output compare json path.")
     p_cmp.add_argument(
         "--require-tool-usage",
-        default="",
+        type=parse_tool_usage_fields,
+        default=[],
         help=(
-            "Comma-separated tool usage counters that must be >0 in test rows. "
-            "Aliases: uv_non_dc_blocks, inter_newmv_blocks, restoration_non_none_units, seg1_blocks."
+            "Comma-separated tool usage counters that must be >0 in test rows "
+            f"(tool_ prefix optional): {', '.join(TOOL_USAGE_COUNTERS)}."
         ),
     )
     p_cmp.add_argument(
@@ -1266,6 +1840,12 @@ def build_parser() -> argparse.ArgumentParser:
     p_cmp.add_argument("--sanity-q", type=int, default=None, help="Q for --require-diff sanity point.")
     p_cmp.add_argument("--dav1d", default=None, help="Path to dav1d binary for --require-diff decode check.")
     p_cmp.add_argument("--fail-on-regression", action="store_true")
+    p_cmp.add_argument(
+        "--bd-jobs",
+        type=int,
+        default=1,
+        help="Worker processes for per-clip BD computation (0 = CPU count). Pays off only for many clips.",
+    )
     p_cmp.set_defaults(func=cmd_compare)
 
     return parser
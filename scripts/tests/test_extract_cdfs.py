@@ -0,0 +1,125 @@
+import itertools
+import math
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import extract_cdfs
+
+FIRST_CDF_ARG_RE = re.compile(r"CDF\d+\((\d+)")
+
+
+def cdf_macro(n, counter):
+    start = 32000 - 7 * next(counter) % 20000
+    return f"CDF{n}({', '.join(str(start - 3 * i) for i in range(n))})"
+
+
+def nested_initializer(shape, widths, counter, leaf_index):
+    if not shape:
+        n = widths(next(leaf_index))
+        return cdf_macro(n, counter)
+    inner = [nested_initializer(shape[1:], widths, counter, leaf_index) for _ in range(shape[0])]
+    return "{ " + ", ".join(inner) + " }"
+
+
+def field(name, shape, widths, counter):
+    if not callable(widths):
+        width = widths
+        widths = lambda _: width
+    return f".{name} = {nested_initializer(shape, widths, counter, itertools.count())}"
+
+
+def with_first_value(text, marker, value, start=0):
+    m = FIRST_CDF_ARG_RE.search(text, text.index(marker, start))
+    return text[:m.start(1)] + str(value) + text[m.end(1):]
+
+
+def build_cdf_c(nest_mode_cdfs):
+    counter = itertools.count()
+    mode_fields = [
+        field("y_mode", [4], 12, counter),
+        field("uv_mode", [2, 13], lambda i: 12 if i < 13 else 13, counter),
+        field("partition", [5, 4], lambda i: [7, 9, 9, 9, 3][i // 4], counter),
+        field("skip_mode", [3], 1, counter),
+        field("skip", [3], 1, counter),
+        field("txtp_intra1", [2, 13], 6, counter),
+        field("txtp_intra2", [3, 13], 4, counter),
+    ]
+    kfym = field("kfym", [5, 5], 12, counter)
+    if nest_mode_cdfs:
+        default_body = ".m = { " + ", ".join(mode_fields) + " }, " + kfym + ", .mv = { .joint = { CDF3(1, 2, 3) } }"
+    else:
+        default_body = ", ".join([*mode_fields, kfym])
+
+    coef_sections = []
+    for qctx in range(4):
+        coef_fields = [
+            field("skip", [5, 13], 1, counter),
+            field("eob_bin_16", [2, 2], 4, counter),
+            field("eob_bin_512", [2], 9, counter),
+            field("eob_bin_1024", [2], 10, counter),
+            field("eob_base_tok", [5, 2, 4], 2, counter),
+            field("eob_hi_bit", [5, 2, 9], 1, counter),
+            field("base_tok", [5, 2, 41], 3, counter),
+            field("br_tok", [4, 2, 21], 3, counter),
+            field("dc_sign", [2, 3], 1, counter),
+        ]
+        coef_sections.append(f"[{qctx}] = {{ " + ", ".join(coef_fields) + " }")
+
+    text = (
+        "#define CDF1(x) (32768-(x))\n"
+        "static const CdfDefaultContext default_cdf = {\n" + default_body + "\n};\n"
+        "static const CdfCoefContext default_coef_cdf[4] = {\n" + ",\n".join(coef_sections) + "\n};\n"
+    )
+    text = with_first_value(text, ".kfym =", 15588)
+    text = with_first_value(text, ".skip =", 31671)
+    text = with_first_value(text, ".skip =", 26887, text.index("[3] = {"))
+    return text.encode("ascii")
+
+
+class ExtractFieldsTest(unittest.TestCase):
+    def test_finds_fields_nested_in_sub_structs(self):
+        section = b".m = { .a = { CDF1(1) }, .b = { CDF1(2) } }, .c = { CDF1(3) }"
+        fields = extract_cdfs.extract_fields(section, ["a", "b", "c"])
+        self.assertEqual(fields, {"a": b" CDF1(1) ", "b": b" CDF1(2) ", "c": b" CDF1(3) "})
+
+    def test_first_occurrence_wins(self):
+        section = b".a = { CDF1(1) }, .m = { .a = { CDF1(2) } }"
+        self.assertEqual(extract_cdfs.extract_fields(section, ["a"]), {"a": b" CDF1(1) "})
+
+    def test_prefix_names_do_not_match(self):
+        section = b".skip_mode = { CDF1(1) }, .skip = { CDF1(2) }"
+        self.assertEqual(extract_cdfs.extract_fields(section, ["skip"]), {"skip": b" CDF1(2) "})
+
+    def test_reports_every_missing_field(self):
+        with self.assertRaisesRegex(ValueError, r"\.x, \.y"):
+            extract_cdfs.extract_fields(b".a = { CDF1(1) }", ["a", "y", "x"])
+
+
+class ExtractTablesTest(unittest.TestCase):
+    def test_nested_mode_cdfs_match_flat_layout(self):
+        nested = extract_cdfs.extract_tables(build_cdf_c(nest_mode_cdfs=True))
+        flat = extract_cdfs.extract_tables(build_cdf_c(nest_mode_cdfs=False))
+        self.assertEqual(nested, flat)
+        self.assertEqual(
+            extract_cdfs.generate_rust_source(nested),
+            extract_cdfs.generate_rust_source(flat),
+        )
+
+    def test_generates_every_const(self):
+        parsed = extract_cdfs.extract_tables(build_cdf_c(nest_mode_cdfs=True))
+        source = extract_cdfs.generate_rust_source(parsed)
+        for name, _, shape, pad in [*extract_cdfs._DEFAULT_CDF_SPECS, *extract_cdfs._COEF_CDF_SPECS]:
+            dims = [*shape, pad]
+            type_str = "[" * (len(dims) - 1) + "[u16" + "".join(f"; {d}]" for d in reversed(dims))
+            self.assertIn(f"pub const {name}: {type_str} =\n", source)
+        entries = dict((name, entries) for name, entries, _, _ in parsed)
+        self.assertEqual(len(entries["DEFAULT_BASE_TOK_CDF"]), math.prod([5, 2, 41]))
+        self.assertEqual(entries["DEFAULT_KF_Y_MODE_CDF"][0][0], 32768 - 15588)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,368 @@
+import argparse
+import json
+import math
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import quality_pipeline
+
+
+def results_payload():
+    rows = []
+    for clip in ("a.y4m", "b.y4m"):
+        for q in (64, 128):
+            rows.append(
+                {
+                    "clip_name": clip,
+                    "clip_path": f"/clips/{clip}",
+                    "q": q,
+                    "status": "ok",
+                    "encoder_stderr": "encoding frames...",
+                    "tool_uv_non_dc_blocks": q,
+                    "ivf_path": f"/out/{clip}_q{q}.ivf",
+                    "bitrate_kbps": 1000.0 / q,
+                    "psnr_avg": 40.25 - q / 64,
+                    "ssim_all": 0.98,
+                    "vmaf": 91.5,
+                }
+            )
+    rows.append({"clip_name": "c.y4m", "q": 64, "status": "error", "error": "boom"})
+    return {"metadata": {"tag": "test"}, "rows": rows}
+
+
+def compare_view(payload):
+    rows = [
+        {k: v for k, v in r.items() if k in quality_pipeline.COMPARE_ROW_FIELDS or k.startswith("tool_")}
+        for r in payload["rows"]
+        if r.get("status") == "ok"
+    ]
+    return {"metadata": payload["metadata"], "rows": rows}
+
+
+def reference_linear_interp(xs, ys, x):
+    if len(xs) < 2 or x < xs[0] or x > xs[-1]:
+        return None
+    if x == xs[0]:
+        return ys[0]
+    if x == xs[-1]:
+        return ys[-1]
+    for i in range(1, len(xs)):
+        if x <= xs[i]:
+            x0, x1 = xs[i - 1], xs[i]
+            y0, y1 = ys[i - 1], ys[i]
+            if x1 == x0:
+                return y0
+            return y0 + (x - x0) / (x1 - x0) * (y1 - y0)
+    return None
+
+
+class DumpJsonTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def test_non_finite_floats_are_written_as_null(self):
+        payload = {"rows": [{"vmaf": math.nan, "psnr_avg": math.inf, "ssim_all": -math.inf, "q": 64}]}
+        with mock.patch.object(quality_pipeline, "orjson", None):
+            quality_pipeline.dump_json(self.tmp / "out.json", payload)
+        self.assertEqual(
+            json.loads((self.tmp / "out.json").read_bytes()),
+            {"rows": [{"vmaf": None, "psnr_avg": None, "ssim_all": None, "q": 64}]},
+        )
+
+    @unittest.skipIf(quality_pipeline.orjson is None, "orjson is not installed")
+    def test_orjson_and_stdlib_output_parse_identically(self):
+        payload = results_payload()
+        payload["rows"][0]["vmaf"] = math.nan
+        payload["summary_by_q"] = {64: {"avg_vmaf": math.inf, "avg_psnr_avg": 1e-05}}
+        quality_pipeline.dump_json(self.tmp / "orjson.json", payload)
+        with mock.patch.object(quality_pipeline, "orjson", None):
+            quality_pipeline.dump_json(self.tmp / "stdlib.json", payload)
+        self.assertEqual(
+            json.loads((self.tmp / "orjson.json").read_bytes()),
+            json.loads((self.tmp / "stdlib.json").read_bytes()),
+        )
+
+
+class InterpolationTest(unittest.TestCase):
+    def curves(self):
+        rng = random.Random(7)
+        for n in (1, 2, 3, 5, 8):
+            xs = sorted(rng.choice([rng.uniform(20, 50), 30.0]) for _ in range(n))
+            ys = [rng.uniform(-2, 8) for _ in xs]
+            lo, hi = (xs[0] - 1, xs[-1] + 1) if n > 1 else (0.0, 1.0)
+            grid = sorted([*quality_pipeline.sample_grid(lo, hi, 57), *xs])
+            yield xs, ys, grid
+
+    def test_sweep_matches_per_sample_interpolation(self):
+        for xs, ys, grid in self.curves():
+            with self.subTest(xs=xs):
+                self.assertEqual(
+                    quality_pipeline.linear_interp_sweep(xs, ys, grid),
+                    [reference_linear_interp(xs, ys, x) for x in grid],
+                )
+
+    def test_mean_delta_matches_per_sample_interpolation(self):
+        curves = list(self.curves())
+        for (a_xs, a_ys, grid), (t_xs, t_ys, _) in zip(curves, curves[1:]):
+            with self.subTest(a_xs=a_xs, t_xs=t_xs):
+                pairs = [(reference_linear_interp(a_xs, a_ys, x), reference_linear_interp(t_xs, t_ys, x)) for x in grid]
+                diffs = [b - a for a, b in pairs if a is not None and b is not None]
+                got = quality_pipeline.mean_interp_delta(a_xs, a_ys, t_xs, t_ys, grid)
+                if diffs:
+                    self.assertAlmostEqual(got, sum(diffs) / len(diffs), places=12)
+                else:
+                    self.assertIsNone(got)
+
+
+class ToolUsageTest(unittest.TestCase):
+    expected = {
+        "tool_uv_non_dc_blocks": 12,
+        "tool_inter_newmv_blocks": 3,
+        "tool_restoration_non_none_units": 0,
+        "tool_seg1_blocks": 7,
+    }
+
+    def test_parses_whitespace_variants(self):
+        parts = ["uv_non_dc_blocks=12", "inter_newmv_blocks=3", "restoration_non_none_units=0", "seg1_blocks=7"]
+        for sep in (" ", "  ", "\t", " \t "):
+            line = "tool_usage " + sep.join(parts)
+            with self.subTest(sep=sep):
+                self.assertEqual(quality_pipeline.parse_tool_usage_from_stderr(f"frame 1\n{line}\r\n"), self.expected)
+
+    def test_missing_or_truncated_line(self):
+        self.assertIsNone(quality_pipeline.parse_tool_usage_from_stderr("encoding frames...\n"))
+        truncated = "tool_usage uv_non_dc_blocks=12 inter_newmv_blocks=3 restoration_non_none_units=0"
+        self.assertIsNone(quality_pipeline.parse_tool_usage_from_stderr(truncated))
+
+    def test_fields_accept_optional_prefix_and_dedupe(self):
+        self.assertEqual(
+            quality_pipeline.parse_tool_usage_fields(" seg1_blocks, tool_uv_non_dc_blocks,,tool_seg1_blocks "),
+            ["tool_seg1_blocks", "tool_uv_non_dc_blocks"],
+        )
+        self.assertEqual(quality_pipeline.parse_tool_usage_fields(""), [])
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaisesRegex(argparse.ArgumentTypeError, "tool_bogus"):
+            quality_pipeline.parse_tool_usage_fields("seg1_blocks,tool_bogus")
+
+
+class SanityFilesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def write(self, name, data):
+        path = self.tmp / name
+        path.write_bytes(data)
+        return path
+
+    def test_files_identical(self):
+        data = bytes(range(256)) * (quality_pipeline.COMPARE_CHUNK_BYTES // 128 + 3)
+        a = self.write("a.ivf", data)
+        self.assertTrue(quality_pipeline.files_identical(a, self.write("same.ivf", data)))
+        self.assertTrue(quality_pipeline.files_identical(self.write("e1.ivf", b""), self.write("e2.ivf", b"")))
+        self.assertFalse(quality_pipeline.files_identical(a, self.write("short.ivf", data[:-1])))
+        for offset in (0, quality_pipeline.COMPARE_CHUNK_BYTES, len(data) - 1):
+            changed = bytearray(data)
+            changed[offset] ^= 1
+            with self.subTest(offset=offset):
+                self.assertFalse(quality_pipeline.files_identical(a, self.write("changed.ivf", bytes(changed))))
+
+    def test_decode_cache_matches_unchanged_ivfs_only(self):
+        ok = self.write("ok.ivf", b"DKIF1")
+        failed = self.write("failed.ivf", b"DKIF2")
+        rows = [
+            {"status": "ok", "ivf_path": str(ok)},
+            {"status": "error", "ivf_path": str(failed)},
+            {"status": "ok", "ivf_path": str(self.tmp / "missing.ivf")},
+        ]
+        quality_pipeline.write_decode_cache(self.tmp, rows, "/bin/dav1d", "1.4.0")
+        results = self.tmp / "results.json"
+        self.assertEqual(quality_pipeline.cached_decoder(results, ok), "/bin/dav1d")
+        self.assertIsNone(quality_pipeline.cached_decoder(results, failed))
+        ok.write_bytes(b"DKIF1 rewritten")
+        self.assertIsNone(quality_pipeline.cached_decoder(results, ok))
+
+    def test_missing_or_corrupt_cache_is_ignored(self):
+        ivf = self.write("a.ivf", b"DKIF")
+        results = self.tmp / "results.json"
+        self.assertIsNone(quality_pipeline.cached_decoder(results, ivf))
+        self.write(quality_pipeline.DECODE_CACHE_NAME, b"{not json")
+        self.assertIsNone(quality_pipeline.cached_decoder(results, ivf))
+
+
+def python_cmd(code):
+    return [sys.executable, "-c", code]
+
+
+class RunPipelineTest(unittest.TestCase):
+    cat = python_cmd("import sys; print(len(sys.stdin.buffer.read())); print('cons-log', file=sys.stderr)")
+
+    def test_pipes_producer_into_consumer(self):
+        producer = python_cmd("import sys; sys.stdout.buffer.write(b'x' * 300000)")
+        result = quality_pipeline.run_pipeline(producer, self.cat)
+        self.assertEqual(result.stdout.strip(), "300000")
+        self.assertEqual(result.stderr.strip(), "cons-log")
+
+    def test_producer_failure_is_reported(self):
+        producer = python_cmd("import sys; print('partial'); print('prod-boom', file=sys.stderr); sys.exit(3)")
+        with self.assertRaises(RuntimeError) as cm:
+            quality_pipeline.run_pipeline(producer, self.cat)
+        self.assertIn("Command failed (3)", str(cm.exception))
+        self.assertIn("prod-boom", str(cm.exception))
+
+    def test_consumer_failure_is_reported_first(self):
+        producer = python_cmd("import sys\nfor _ in range(64): sys.stdout.buffer.write(b'x' * 65536)")
+        consumer = python_cmd("import sys; sys.stdin.read(1); print('cons-boom', file=sys.stderr); sys.exit(4)")
+        with self.assertRaises(RuntimeError) as cm:
+            quality_pipeline.run_pipeline(producer, consumer)
+        self.assertIn("Command failed (4)", str(cm.exception))
+        self.assertIn("cons-boom", str(cm.exception))
+
+    def test_producer_is_reaped_when_consumer_cannot_start(self):
+        started = []
+        popen = quality_pipeline.subprocess.Popen
+
+        def spawn(*args, **kwargs):
+            started.append(popen(*args, **kwargs))
+            return started[-1]
+
+        with mock.patch.object(quality_pipeline.subprocess, "Popen", side_effect=spawn):
+            with self.assertRaises(FileNotFoundError):
+                quality_pipeline.run_pipeline(python_cmd("import time; time.sleep(30)"), ["/nonexistent/consumer"])
+        self.assertEqual(len(started), 1)
+        self.assertIsNotNone(started[0].returncode)
+
+
+class ClipSpecTest(unittest.TestCase):
+    def test_rawvideo_dimensions_must_be_positive(self):
+        for input_type in ("rawvideo", ""):
+            with self.subTest(input_type=input_type), self.assertRaisesRegex(ValueError, "width"):
+                raw = {"path": "a.yuv", "input_type": input_type, "width": 0, "height": 4}
+                quality_pipeline.ClipSpec.from_json(raw, 0)
+
+    def test_video_entries_ignore_input_dimensions(self):
+        spec = quality_pipeline.ClipSpec.from_json({"path": "a.mp4", "input_type": "video", "width": 0, "height": -1}, 0)
+        self.assertIsNone(spec.width)
+        self.assertIsNone(spec.height)
+
+    def test_output_dimensions_accept_ffmpeg_scale_values(self):
+        spec = quality_pipeline.ClipSpec.from_json({"path": "a.mp4", "output_width": -2, "output_height": 720}, 0)
+        self.assertEqual((spec.output_width, spec.output_height), (-2, 720))
+        cmd = quality_pipeline.build_convert_cmd("ffmpeg", Path("a.mp4"), Path("a.y4m"), spec)
+        self.assertIn("scale=-2:720:flags=bicubic", cmd)
+
+
+class Y4mDurationTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "clip.y4m"
+
+    def write_y4m(self, header, frame_bytes, frames):
+        with self.path.open("wb") as f:
+            f.write(b"YUV4MPEG2 " + header + b"\n")
+            for _ in range(frames):
+                f.write(b"FRAME\n" + bytes(frame_bytes))
+
+    def test_odd_420_dimensions_round_chroma_up(self):
+        self.write_y4m(b"W5 H3 F30:1 C420jpeg", 5 * 3 + 2 * 3 * 2, 6)
+        self.assertEqual(quality_pipeline.y4m_duration_seconds(self.path), 6 / 30)
+
+    def test_high_bit_depth_422(self):
+        self.write_y4m(b"W4 H2 F24000:1001 C422p10", (4 * 2 + 2 * 2 * 2) * 2, 3)
+        self.assertAlmostEqual(quality_pipeline.y4m_duration_seconds(self.path), 3 * 1001 / 24000)
+
+    def test_mono(self):
+        self.write_y4m(b"W3 H3 F25:1 Cmono", 9, 5)
+        self.assertEqual(quality_pipeline.y4m_duration_seconds(self.path), 5 / 25)
+
+    def test_payload_not_a_whole_number_of_frames(self):
+        self.write_y4m(b"W4 H4 F30:1 C420", 4 * 4 + 2 * 2 * 2 + 1, 2)
+        self.assertIsNone(quality_pipeline.y4m_duration_seconds(self.path))
+
+    def test_malformed_tokens_return_none(self):
+        for header in (b"Wabc H4 F30:1", b"W4 H4x F30:1", b"W4 H4 F30:one", b"W4 H4 F:1", b"W4 H4 F30:0"):
+            with self.subTest(header=header):
+                self.write_y4m(header, 4 * 4 + 2 * 2 * 2, 1)
+                self.assertIsNone(quality_pipeline.y4m_duration_seconds(self.path))
+
+
+class CompareOutputTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        for name in ("anchor", "test"):
+            quality_pipeline.dump_json(self.tmp / f"{name}.json", results_payload())
+        self.out = self.tmp / "cmp.json"
+        argv = ["compare", "--anchor", str(self.tmp / "anchor.json"), "--test", str(self.tmp / "test.json")]
+        self.args = quality_pipeline.build_parser().parse_args([*argv, "--out", str(self.out), "--bd-jobs", "1"])
+
+    def test_csv_is_written_with_json(self):
+        with mock.patch("builtins.print"):
+            self.assertEqual(self.args.func(self.args), 0)
+        lines = self.out.with_suffix(".csv").read_text().splitlines()
+        self.assertEqual(
+            lines[0],
+            "clip_name,q,anchor_bitrate_kbps,test_bitrate_kbps,delta_bitrate_kbps,delta_psnr_avg,delta_ssim_all,delta_vmaf",
+        )
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(sorted(p.name for p in self.tmp.iterdir()), ["anchor.json", "cmp.csv", "cmp.json", "test.json"])
+
+    def test_csv_is_not_left_behind_when_json_fails(self):
+        with mock.patch.object(quality_pipeline, "dump_json", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.args.func(self.args)
+        self.assertEqual(sorted(p.name for p in self.tmp.iterdir()), ["anchor.json", "test.json"])
+
+
+@unittest.skipIf(quality_pipeline.ijson is None, "ijson is not installed")
+class StreamingResultsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "results.json"
+
+    def test_streaming_keeps_ok_rows_and_compare_fields(self):
+        payload = results_payload()
+        quality_pipeline.dump_json(self.path, payload)
+        self.assertEqual(quality_pipeline.load_results_streaming(self.path), compare_view(payload))
+
+    def test_large_files_are_streamed(self):
+        payload = results_payload()
+        quality_pipeline.dump_json(self.path, payload)
+        with mock.patch.object(quality_pipeline, "STREAM_RESULTS_MIN_BYTES", 0):
+            loaded = quality_pipeline.load_compare_results(self.path)
+        self.assertEqual(loaded, compare_view(payload))
+
+    def test_empty_rows_fall_back_to_full_load(self):
+        quality_pipeline.dump_json(self.path, {"metadata": {"tag": "empty"}, "rows": []})
+        self.assertEqual(quality_pipeline.load_results_streaming(self.path), {"metadata": {"tag": "empty"}, "rows": []})
+
+    def test_missing_rows_is_rejected(self):
+        quality_pipeline.dump_json(self.path, {"metadata": {}})
+        with self.assertRaises(ValueError):
+            quality_pipeline.load_results_streaming(self.path)
+
+    def test_legacy_nan_tokens_fall_back_to_json(self):
+        payload = results_payload()
+        payload["rows"][0]["vmaf"] = math.nan
+        self.path.write_text(json.dumps(payload, indent=2))
+        with mock.patch.object(quality_pipeline, "STREAM_RESULTS_MIN_BYTES", 0):
+            loaded = quality_pipeline.load_compare_results(self.path)
+        self.assertTrue(math.isnan(loaded["rows"][0]["vmaf"]))
+        self.assertEqual(len(loaded["rows"]), len(payload["rows"]))
+
+
+if __name__ == "__main__":
+    unittest.main()